@@ -1,5 +1,20 @@
 from os import path, sep
 import arcpy
+import numpy as np
+
+_root = path.dirname(path.dirname(path.realpath(__file__)))
+_in_gdb = sep.join([_root, 'in', 'input.gdb'])
+_out_gdb = sep.join([_root, 'out', 'output.gdb'])
+
+_ipc_load_field = {
+    'N': 'N_2012_LAM',
+    'P': 'P_2012_LAM'
+}
+
+_sect4_elv_fields = {
+    'N': ["TON_ELV", "TN_ELV", "NO3_ELV", "NH3_ELV", "NH4_ELV", "NO2_ELV"],
+    'P': ["TP_ELV", "PO4_ELV"]
+}
 
 
 class IndustryV2(object):
@@ -12,14 +27,9 @@ class IndustryV2(object):
 
     def getParameterInfo(self):
         # Define Workspace
-        root = path.dirname(path.dirname(path.realpath(__file__)))
-        arcpy.env.workspace = root
+        arcpy.env.workspace = _root
 
         # Parameters for Folders Options
-        in_gdb = sep.join([root, 'in', 'input.gdb'])
-
-        in_fld = sep.join([root, 'in'])
-
         out_gdb = arcpy.Parameter(
             displayName="Output Geodatabase",
             name="out_gdb",
@@ -27,7 +37,7 @@ class IndustryV2(object):
             parameterType="Required",
             direction="Input",
             category='# Folders Settings')
-        out_gdb.value = sep.join([root, 'out', 'output.gdb'])
+        out_gdb.value = _out_gdb
 
         # Parameters Common to All Sources
         project_name = arcpy.Parameter(
@@ -69,7 +79,7 @@ class IndustryV2(object):
             parameterType="Required",
             direction="Input",
             category="Industry Data Settings")
-        in_ipc.value = sep.join([in_gdb, 'IPPC_Loads_LAM2'])
+        in_ipc.value = sep.join([_in_gdb, 'IPPC_Loads_LAM2'])
 
         in_sect4 = arcpy.Parameter(
             displayName="Section 4 Licences Data",
@@ -78,7 +88,7 @@ class IndustryV2(object):
             parameterType="Required",
             direction="Input",
             category="Industry Data Settings")
-        in_sect4.value = sep.join([in_gdb, 'Section4Discharges_D07_IsMain'])
+        in_sect4.value = sep.join([_in_gdb, 'Section4Discharges_D07_IsMain'])
 
         return [out_gdb,
                 project_name, nutrient, region, selection,
@@ -95,17 +105,18 @@ class IndustryV2(object):
         # determine which location to work on
         if selection:  # i.e. selection requested
             messages.addMessage("> Selecting requested Location(s) within Region.")
-            location = sep.join([out_gdb, project_name + '_SelectedRegion'])
-            arcpy.Select_analysis(in_features=region, out_feature_class=location, where_clause=selection)
+            location = project_name + '_SelectedRegion'
+            arcpy.MakeFeatureLayer_management(in_features=region, out_layer=location, where_clause=selection)
         else:
             location = region
 
         # run geoprocessing function
-        industry_v2_geoprocessing(project_name, nutrient, location, in_ipc, in_sect4, out_gdb, messages)
-
-        # garbage collection
-        if selection:
-            arcpy.Delete_management(location)
+        try:
+            industry_v2_geoprocessing(project_name, nutrient, location, in_ipc, in_sect4, out_gdb, messages)
+        finally:
+            # garbage collection (even if the geoprocessing failed)
+            if selection:
+                arcpy.Delete_management(location)
 
 
 def industry_v2_geoprocessing(project_name, nutrient, location, in_ipc, in_sect4, out_gdb, messages,
@@ -130,63 +141,91 @@ def industry_v2_geoprocessing(project_name, nutrient, location, in_ipc, in_sect4
     :param out_sect4: path of the output feature class for Section 4 licensed industry load [optional]
     :type out_sect4: str
     """
-    # calculate load for IPC licences
-    messages.addMessage("> Calculating {} load for IPC Industries.".format(nutrient))
-
     if not out_ipc:
         out_ipc = sep.join([out_gdb, project_name + '_{}_IndustryIPC'.format(nutrient)])
 
-    arcpy.Intersect_analysis(in_features=[location, in_ipc], out_feature_class=out_ipc,
-                             join_attributes="ALL", output_type="INPUT")
+    if not out_sect4:
+        out_sect4 = sep.join([out_gdb, project_name + '_{}_IndustrySect4'.format(nutrient)])
 
-    arcpy.AddField_management(in_table=out_ipc, field_name="IPInd2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_ipc, field="IPInd2calc",
-                                    expression="!{}_2012_LAM!".format(nutrient),
-                                    expression_type="PYTHON_9.3")
+    # let the intersects use all available cores (for those ArcGIS versions supporting it)
+    parallel_processing_factor = arcpy.env.parallelProcessingFactor
+    arcpy.env.parallelProcessingFactor = "100%"
 
-    # calculate load for Section 4 licences
-    messages.addMessage("> Calculating {} load for Section 4 Industries.".format(nutrient))
+    try:
+        # calculate load for IPC licences
+        _industry_ipc_geoprocessing(nutrient, location, in_ipc, out_ipc, messages)
+
+        # calculate load for Section 4 licences
+        _industry_sect4_geoprocessing(nutrient, location, in_sect4, out_sect4, messages)
+    finally:
+        arcpy.env.parallelProcessingFactor = parallel_processing_factor
+
+    return out_ipc, out_sect4
 
-    if not out_sect4:
-        out_sect4 = sep.join([out_gdb, project_name + '_{}_IndustrySect4'.format(nutrient)])
 
-    arcpy.Intersect_analysis(in_features=[location, in_sect4], out_feature_class=out_sect4,
+def _industry_ipc_geoprocessing(nutrient, location, in_ipc, out_ipc, messages):
+    """
+    :param nutrient: nutrient of interest {possible values: 'N' or 'P'} [required]
+    :type nutrient: str
+    :param location: path of the feature class for the location of interest [required]
+    :type location: str
+    :param in_ipc: path of the input feature class of the IPC licensed industry data [required]
+    :type in_ipc: str
+    :param out_ipc: path of the output feature class for IPC licensed industry load [required]
+    :type out_ipc: str
+    :param messages: object used for communication with the user interface [required]
+    :type messages: instance of a class featuring a 'addMessage' method
+    """
+    messages.addMessage("> Calculating {} load for IPC Industries.".format(nutrient))
+
+    arcpy.Intersect_analysis(in_features=[location, in_ipc], out_feature_class=out_ipc,
                              join_attributes="ALL", output_type="INPUT")
 
-    arcpy.AddField_management(in_table=out_sect4, field_name="Sect4_Flow", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_sect4, field="Sect4_Flow",
-                                    expression="flow(float(!Flow__m3_d!), float(!Discharge_!))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def flow(flow_m3_d, discharge):
-                                    if flow_m3_d > 0:
-                                        return flow_m3_d
-                                    else:
-                                        return discharge
-                                    """)
-
-    arcpy.AddField_management(in_table=out_sect4, field_name="Sect4_ELV", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_sect4, field="Sect4_ELV",
-                                    expression="elv(float(!TON_ELV!), float(!TN_ELV!), float(!NO3_ELV!), "
-                                               "float(!NH3_ELV!), float(!NH4_ELV!), float(!NO2_ELV!), "
-                                               "float(!TP_ELV!), float(!PO4_ELV!))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def elv(ton, tn, no3, nh3, nh4, no2, tp, po4):
-                                    nutrient = '{}'
-                                    if nutrient == 'N':
-                                        return float(max([ton, tn, no3, nh3, nh4, no2]))
-                                    else:
-                                        return float(max([tp, po4]))
-                                    """.format(nutrient))
-
-    arcpy.AddField_management(in_table=out_sect4, field_name="S4Ind2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_sect4, field="S4Ind2calc",
-                                    expression="!Sect4_ELV! * 0.25 * !Sect4_Flow! * 0.365",
-                                    expression_type="PYTHON_9.3")
+    # the load is taken as is from the licences data, so rename the field rather than copy its values
+    arcpy.AlterField_management(in_table=out_ipc, field=_ipc_load_field[nutrient],
+                                new_field_name="IPInd2calc", new_field_alias="IPInd2calc")
 
-    return out_ipc, out_sect4
+
+def _industry_sect4_geoprocessing(nutrient, location, in_sect4, out_sect4, messages):
+    """
+    :param nutrient: nutrient of interest {possible values: 'N' or 'P'} [required]
+    :type nutrient: str
+    :param location: path of the feature class for the location of interest [required]
+    :type location: str
+    :param in_sect4: path of the input feature class of the Section 4 licensed industry data [required]
+    :type in_sect4: str
+    :param out_sect4: path of the output feature class for Section 4 licensed industry load [required]
+    :type out_sect4: str
+    :param messages: object used for communication with the user interface [required]
+    :type messages: instance of a class featuring a 'addMessage' method
+    """
+    messages.addMessage("> Calculating {} load for Section 4 Industries.".format(nutrient))
+
+    # work in memory (under a name without extension, e.g. '.shp') and only write the final result to disk
+    tmp_sect4 = sep.join(['in_memory', path.splitext(path.basename(out_sect4))[0]])
+
+    try:
+        arcpy.Intersect_analysis(in_features=[location, in_sect4], out_feature_class=tmp_sect4,
+                                 join_attributes="ALL", output_type="INPUT")
+
+        # compute flow, emission limit value, and load for all licences at once
+        elv_fields = _sect4_elv_fields[nutrient]
+        oid_field = arcpy.Describe(tmp_sect4).OIDFieldName
+        # (missing values are read as zeros, i.e. missing flows fall back on discharge, missing limits are ignored)
+        licences = arcpy.da.TableToNumPyArray(tmp_sect4, [oid_field, "Flow__m3_d", "Discharge_"] + elv_fields,
+                                              null_value=0.0)
+
+        loads = np.empty(licences.size, dtype=[("OID", 'i4'),
+                                               ("Sect4_Flow", 'f8'), ("Sect4_ELV", 'f8'), ("S4Ind2calc", 'f8')])
+        loads["OID"] = licences[oid_field]
+        loads["Sect4_Flow"] = np.where(licences["Flow__m3_d"] > 0, licences["Flow__m3_d"], licences["Discharge_"])
+        loads["Sect4_ELV"] = np.column_stack([licences[field] for field in elv_fields]).max(axis=1)
+        loads["S4Ind2calc"] = loads["Sect4_ELV"] * (0.25 * 0.365) * loads["Sect4_Flow"]
+
+        arcpy.da.ExtendTable(tmp_sect4, oid_field, loads, "OID", append_only=False)
+
+        arcpy.CopyFeatures_management(in_features=tmp_sect4, out_feature_class=out_sect4)
+    finally:
+        # garbage collection (even if the geoprocessing failed)
+        if arcpy.Exists(tmp_sect4):
+            arcpy.Delete_management(tmp_sect4)
@@ -1,6 +1,15 @@
 from os import path, sep
 import arcpy
 
+_root = path.dirname(path.dirname(path.realpath(__file__)))
+_in_gdb = sep.join([_root, 'in', 'input.gdb'])
+_in_fld = sep.join([_root, 'in'])
+_out_gdb = sep.join([_root, 'out', 'output.gdb'])
+
+_wwtp_factors_fields = ["raw", "prelim", "primary", "second", "tertN", "tertNP", "tertP", "POPfactor"]
+
+_wwtp_factors_cache = {}
+
 
 class WastewaterV3(object):
     def __init__(self):
@@ -17,14 +26,9 @@ class WastewaterV3(object):
 
     def getParameterInfo(self):
         # Define Workspace
-        root = path.dirname(path.dirname(path.realpath(__file__)))
-        arcpy.env.workspace = root
+        arcpy.env.workspace = _root
 
         # Parameters for Folders Options
-        in_gdb = sep.join([root, 'in', 'input.gdb'])
-
-        in_fld = sep.join([root, 'in'])
-
         out_gdb = arcpy.Parameter(
             displayName="Output Geodatabase",
             name="out_gdb",
@@ -32,7 +36,7 @@ class WastewaterV3(object):
             parameterType="Required",
             direction="Input",
             category='# Folders Settings')
-        out_gdb.value = sep.join([root, 'out', 'output.gdb'])
+        out_gdb.value = _out_gdb
 
         # Parameters Common to All Sources
         project_name = arcpy.Parameter(
@@ -74,7 +78,7 @@ class WastewaterV3(object):
             parameterType="Required",
             direction="Input",
             category="Wastewater Data Settings")
-        in_agglo.value = sep.join([in_gdb, 'UWW_EmissionPointData_2016'])
+        in_agglo.value = sep.join([_in_gdb, 'UWW_EmissionPointData_2016'])
 
         in_uww_field = arcpy.Parameter(
             displayName="Field for urban wastewater emission load (include {} where it should be replaced by N or P)",
@@ -100,18 +104,19 @@ class WastewaterV3(object):
         # determine which location to work on
         if selection:  # i.e. selection requested
             messages.addMessage("> Selecting requested Location(s) within Region.")
-            location = sep.join([out_gdb, project_name + '_SelectedRegion'])
-            arcpy.Select_analysis(in_features=region, out_feature_class=location, where_clause=selection)
+            location = project_name + '_SelectedRegion'
+            arcpy.MakeFeatureLayer_management(in_features=region, out_layer=location, where_clause=selection)
         else:
             location = region
 
         # run geoprocessing function
-        wastewater_v3_geoprocessing(project_name, nutrient, location, in_agglo, in_uww_field,
-                                    out_gdb, messages)
-
-        # garbage collection
-        if selection:
-            arcpy.Delete_management(location)
+        try:
+            wastewater_v3_geoprocessing(project_name, nutrient, location, in_agglo, in_uww_field,
+                                        out_gdb, messages)
+        finally:
+            # garbage collection (even if the geoprocessing failed)
+            if selection:
+                arcpy.Delete_management(location)
 
 
 def wastewater_v3_geoprocessing(project_name, nutrient, location, in_agglo, in_uww_field,
@@ -141,15 +146,14 @@ def wastewater_v3_geoprocessing(project_name, nutrient, location, in_agglo, in_u
     if not out_agglo:
         out_agglo = sep.join([out_gdb, project_name + '_{}_Wastewater'.format(nutrient)])
 
-    arcpy.SpatialJoin_analysis(target_features=in_agglo, join_features=location, out_feature_class=out_agglo,
-                               join_operation="JOIN_ONE_TO_ONE", join_type="KEEP_COMMON",
-                               match_option='CLOSEST', search_radius='2000 Meters')
+    _closest_location_join(in_agglo, location, out_agglo)
 
     arcpy.AddField_management(in_table=out_agglo, field_name="Wast3calc", field_type="DOUBLE",
                               field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_agglo, field="Wast3calc",
-                                    expression="!{}!".format(in_uww_field).format(nutrient),
-                                    expression_type="PYTHON_9.3")
+    with arcpy.da.UpdateCursor(out_agglo, [in_uww_field.format(nutrient), "Wast3calc"]) as cursor:
+        for row in cursor:
+            row[1] = row[0]
+            cursor.updateRow(row)
 
     return out_agglo
 
@@ -168,14 +172,9 @@ class WastewaterV2(object):
 
     def getParameterInfo(self):
         # Define Workspace
-        root = path.dirname(path.dirname(path.realpath(__file__)))
-        arcpy.env.workspace = root
+        arcpy.env.workspace = _root
 
         # Parameters for Folders Options
-        in_gdb = sep.join([root, 'in', 'input.gdb'])
-
-        in_fld = sep.join([root, 'in'])
-
         out_gdb = arcpy.Parameter(
             displayName="Output Geodatabase",
             name="out_gdb",
@@ -183,7 +182,7 @@ class WastewaterV2(object):
             parameterType="Required",
             direction="Input",
             category='# Folders Settings')
-        out_gdb.value = sep.join([root, 'out', 'output.gdb'])
+        out_gdb.value = _out_gdb
 
         # Parameters Common to All Sources
         project_name = arcpy.Parameter(
@@ -225,7 +224,7 @@ class WastewaterV2(object):
             parameterType="Required",
             direction="Input",
             category="Wastewater Data Settings")
-        in_agglo.value = sep.join([in_gdb, 'SLAM_Agglom15_March17_IsMain'])
+        in_agglo.value = sep.join([_in_gdb, 'SLAM_Agglom15_March17_IsMain'])
 
         in_treated_field = arcpy.Parameter(
             displayName="Field for Treated WWTP Outflow (include {} where it should be replaced by N or P)",
@@ -260,18 +259,19 @@ class WastewaterV2(object):
         # determine which location to work on
         if selection:  # i.e. selection requested
             messages.addMessage("> Selecting requested Location(s) within Region.")
-            location = sep.join([out_gdb, project_name + '_SelectedRegion'])
-            arcpy.Select_analysis(in_features=region, out_feature_class=location, where_clause=selection)
+            location = project_name + '_SelectedRegion'
+            arcpy.MakeFeatureLayer_management(in_features=region, out_layer=location, where_clause=selection)
         else:
             location = region
 
         # run geoprocessing function
-        wastewater_v2_geoprocessing(project_name, nutrient, location, in_agglo, in_treated_field, in_overflow_field,
-                                    out_gdb, messages)
-
-        # garbage collection
-        if selection:
-            arcpy.Delete_management(location)
+        try:
+            wastewater_v2_geoprocessing(project_name, nutrient, location, in_agglo, in_treated_field, in_overflow_field,
+                                        out_gdb, messages)
+        finally:
+            # garbage collection (even if the geoprocessing failed)
+            if selection:
+                arcpy.Delete_management(location)
 
 
 def wastewater_v2_geoprocessing(project_name, nutrient, location, in_agglo, in_treated_field, in_overflow_field,
@@ -303,21 +303,15 @@ def wastewater_v2_geoprocessing(project_name, nutrient, location, in_agglo, in_t
     if not out_agglo:
         out_agglo = sep.join([out_gdb, project_name + '_{}_Wastewater'.format(nutrient)])
 
-    arcpy.SpatialJoin_analysis(target_features=in_agglo, join_features=location, out_feature_class=out_agglo,
-                               join_operation="JOIN_ONE_TO_ONE", join_type="KEEP_COMMON",
-                               match_option='CLOSEST', search_radius='2000 Meters')
+    _closest_location_join(in_agglo, location, out_agglo)
 
-    arcpy.AddField_management(in_table=out_agglo, field_name="SWOWast2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_agglo, field="SWOWast2calc",
-                                    expression="!{}!".format(in_overflow_field).format(nutrient),
-                                    expression_type="PYTHON_9.3")
+    _add_double_fields(out_agglo, ["SWOWast2calc", "Wast2calc"])
 
-    arcpy.AddField_management(in_table=out_agglo, field_name="Wast2calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_agglo, field="Wast2calc",
-                                    expression="!{}!".format(in_treated_field).format(nutrient),
-                                    expression_type="PYTHON_9.3")
+    with arcpy.da.UpdateCursor(out_agglo, [in_overflow_field.format(nutrient), in_treated_field.format(nutrient),
+                                           "SWOWast2calc", "Wast2calc"]) as cursor:
+        for row in cursor:
+            row[2:] = row[:2]
+            cursor.updateRow(row)
 
     return out_agglo
 
@@ -337,14 +331,9 @@ class WastewaterV1(object):
 
     def getParameterInfo(self):
         # Define Workspace
-        root = path.dirname(path.dirname(path.realpath(__file__)))
-        arcpy.env.workspace = root
+        arcpy.env.workspace = _root
 
         # Parameters for Folders Options
-        in_gdb = sep.join([root, 'in', 'input.gdb'])
-
-        in_fld = sep.join([root, 'in'])
-
         out_gdb = arcpy.Parameter(
             displayName="Output Geodatabase",
             name="out_gdb",
@@ -352,7 +341,7 @@ class WastewaterV1(object):
             parameterType="Required",
             direction="Input",
             category='# Folders Settings')
-        out_gdb.value = sep.join([root, 'out', 'output.gdb'])
+        out_gdb.value = _out_gdb
 
         # Parameters Common to All Sources
         project_name = arcpy.Parameter(
@@ -394,7 +383,7 @@ class WastewaterV1(object):
             parameterType="Required",
             direction="Input",
             category="Wastewater Data Settings")
-        in_wwtp.value = sep.join([in_gdb, 'LAM_Agglom_Nov15'])
+        in_wwtp.value = sep.join([_in_gdb, 'LAM_Agglom_Nov15'])
 
         in_factors_wwtp_n = arcpy.Parameter(
             displayName="WWTP Factors for Nitrogen (N)",
@@ -403,7 +392,7 @@ class WastewaterV1(object):
             parameterType="Required",
             direction="Input",
             category="Wastewater Data Settings")
-        in_factors_wwtp_n.value = sep.join([in_fld, 'LAM_Factors.xlsx', 'UWWTP_N$'])
+        in_factors_wwtp_n.value = sep.join([_in_fld, 'LAM_Factors.xlsx', 'UWWTP_N$'])
 
         in_factors_wwtp_p = arcpy.Parameter(
             displayName="WWTP Factors for Phosphorus (P)",
@@ -412,7 +401,7 @@ class WastewaterV1(object):
             parameterType="Required",
             direction="Input",
             category="Wastewater Data Settings")
-        in_factors_wwtp_p.value = sep.join([in_fld, 'LAM_Factors.xlsx', 'UWWTP_P$'])
+        in_factors_wwtp_p.value = sep.join([_in_fld, 'LAM_Factors.xlsx', 'UWWTP_P$'])
 
         return [out_gdb,
                 project_name, nutrient, region, selection,
@@ -429,8 +418,8 @@ class WastewaterV1(object):
         # determine which location to work on
         if selection:  # i.e. selection requested
             messages.addMessage("> Selecting requested Location(s) within Region.")
-            location = sep.join([out_gdb, project_name + '_SelectedRegion'])
-            arcpy.Select_analysis(in_features=region, out_feature_class=location, where_clause=selection)
+            location = project_name + '_SelectedRegion'
+            arcpy.MakeFeatureLayer_management(in_features=region, out_layer=location, where_clause=selection)
         else:
             location = region
 
@@ -438,11 +427,12 @@ class WastewaterV1(object):
         in_factors_wwtp = in_factors_wwtp_n if nutrient == 'N' else in_factors_wwtp_p
 
         # run geoprocessing function
-        wastewater_v1_geoprocessing(project_name, nutrient, location, in_wwtp, in_factors_wwtp, out_gdb, messages)
-
-        # garbage collection
-        if selection:
-            arcpy.Delete_management(location)
+        try:
+            wastewater_v1_geoprocessing(project_name, nutrient, location, in_wwtp, in_factors_wwtp, out_gdb, messages)
+        finally:
+            # garbage collection (even if the geoprocessing failed)
+            if selection:
+                arcpy.Delete_management(location)
 
 
 def wastewater_v1_geoprocessing(project_name, nutrient, location, in_wwtp, in_factors_wwtp, out_gdb, messages,
@@ -471,105 +461,174 @@ def wastewater_v1_geoprocessing(project_name, nutrient, location, in_wwtp, in_fa
     if not out_wwtp:
         out_wwtp = sep.join([out_gdb, project_name + '_{}_Wastewater'.format(nutrient)])
 
-    arcpy.SpatialJoin_analysis(target_features=in_wwtp, join_features=location, out_feature_class=out_wwtp,
-                               join_operation="JOIN_ONE_TO_ONE", join_type="KEEP_COMMON",
-                               match_option='CLOSEST', search_radius='2000 Meters')
+    _closest_location_join(in_wwtp, location, out_wwtp)
 
     arcpy.DeleteIdentical_management(in_dataset=out_wwtp, fields="RegCD", z_tolerance="0")
 
-    arcpy.AddField_management(in_table=out_wwtp, field_name="PE_calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_wwtp, field="PE_calc",
-                                    expression="factor(float(!AER14_PE!), float(!LEMA_PE!))",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def factor(aer14, lema):
-                                    if aer14 > 1:
-                                        return aer14
-                                    else:
-                                        return lema
-                                    """)
-
-    raw, prelim, primary, second, tertN, tertNP, tertP, POPfactor = None, None, None, None, None, None, None, None
-    found = False
-    for row in arcpy.SearchCursor(in_factors_wwtp):
-        if row.getValue('FactorName') == '{}_factors'.format(nutrient):
-            raw = float(row.getValue('raw'))
-            prelim = float(row.getValue('prelim'))
-            primary = float(row.getValue('primary'))
-            second = float(row.getValue('second'))
-            tertN = float(row.getValue('tertN'))
-            tertNP = float(row.getValue('tertNP'))
-            tertP = float(row.getValue('tertP'))
-            POPfactor = float(row.getValue('POPfactor'))
-            found = True
-            break
-    if not found:
-        raise Exception('Factors for {} are not available in {}'.format(nutrient, in_factors_wwtp))
+    raw, prelim, primary, second, tertN, tertNP, tertP, POPfactor = _get_wwtp_factors(in_factors_wwtp, nutrient)
+
+    _add_double_fields(out_wwtp, ["PE_calc", "Treat_Fact", "PEqWast1calc", "PEqSWOWast1calc",
+                                  "AERWast1calc", "AERSWOWast1calc"])
+
+    treatment_factors = {
+        '0 - No Treatment': raw,
+        '0 - Preliminary Treatment': prelim,
+        '1 - Primary Treatment': primary,
+        '2 - Secondary Treatment': second,
+        '3N - Tertiary N Removal': tertN,
+        '3NP - Tertiary N&P Removal': tertNP,
+        '3P - Tertiary P Removal': tertP,
+        'Secondary': second
+    }
+
+    pop_load = POPfactor * 365 / 1000
+
+    # compute population equivalent, treatment factor, and loads in a single pass over the plants
+    out_of_range = []
+    with arcpy.da.UpdateCursor(out_wwtp, ["AER14_PE", "LEMA_PE", "TreatmentL",
+                                          "{}_WWTP_AER".format(nutrient), "{}_SWO_AER".format(nutrient),
+                                          "PE", "LOSS_perce",
+                                          "PE_calc", "Treat_Fact", "PEqWast1calc", "PEqSWOWast1calc",
+                                          "AERWast1calc", "AERSWOWast1calc", "RegCD"]) as cursor:
+        for row in cursor:
+            aer14, lema = float(row[0]), float(row[1])
+            wwtp_aer, swo_aer = float(row[3]), float(row[4])
+            pe, loss_perce = float(row[5]), float(row[6])
+
+            pe_calc = aer14 if aer14 > 1 else lema
+            treat_fact = treatment_factors.get(row[2], primary)
+
+            # (out of range loss fractions fall back on the default, e.g. a loss of 100% reported at the SWOs)
+            if loss_perce >= 0.9:
+                out_of_range.append(row[13])
+                loss_perce = 0.03
+
+            row[7:13] = [pe_calc,
+                         treat_fact,
+                         0 if wwtp_aer > 1 else pe_calc * treat_fact * pop_load,
+                         (pe * pop_load) / (1 - loss_perce) * loss_perce if swo_aer < 0.1 else 0,
+                         row[3],
+                         row[4]]
+            cursor.updateRow(row)
+
+    if out_of_range:
+        # (the object used for communication may not feature a method for warnings, e.g. outside of ArcGIS)
+        add_warning = getattr(messages, 'addWarningMessage', messages.addMessage)
+        add_warning("> Default loss fraction of 0.03 used for plant(s) with a loss fraction of 0.9 or more: "
+                    "{}.".format(', '.join(str(reg_cd) for reg_cd in out_of_range)))
+
+
+def _closest_location_join(in_agglo, location, out_agglo):
+    """
+    Join each agglomeration to its closest location within 2000 metres,
+    joining those agglomerations lying within a location directly so
+    that the closest search only runs on the agglomerations remaining
+    in reach of a location.
 
-    arcpy.AddField_management(in_table=out_wwtp, field_name="Treat_Fact", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_wwtp, field="Treat_Fact",
-                                    expression="factor(!TreatmentL!)",
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def factor(treatment):
-                                    if treatment == '0 - No Treatment':
-                                        return {}
-                                    elif treatment == '0 - Preliminary Treatment':
-                                        return {}
-                                    elif treatment == '1 - Primary Treatment':
-                                        return {}
-                                    elif treatment == '2 - Secondary Treatment':
-                                        return {}
-                                    elif treatment == '3N - Tertiary N Removal':
-                                        return {}
-                                    elif treatment == '3NP - Tertiary N&P Removal':
-                                        return {}
-                                    elif treatment == '3P - Tertiary P Removal':
-                                        return {}
-                                    elif treatment == 'Secondary':
-                                        return {}
-                                    else:
-                                        return {}
-                                    """.format(raw, prelim, primary, second, tertN, tertNP, tertP, second, primary))
-
-    arcpy.AddField_management(in_table=out_wwtp, field_name="PEqWast1calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_wwtp, field="PEqWast1calc",
-                                    expression="value(float(!{}_WWTP_AER!), float(!PE_calc!), "
-                                               "float(!Treat_Fact!))".format(nutrient),
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def value(wwtp_aer, pe_calc, treat_fact):
-                                    if wwtp_aer > 1:
-                                        return 0
-                                    else:
-                                        return pe_calc * treat_fact *({} * 365 / 1000)
-                                    """.format(POPfactor))
-
-    arcpy.AddField_management(in_table=out_wwtp, field_name="PEqSWOWast1calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_wwtp, field="PEqSWOWast1calc",
-                                    expression="value(float(!{}_SWO_AER!), float(!PE!), "
-                                               "float(!LOSS_perce!))".format(nutrient),
-                                    expression_type="PYTHON_9.3",
-                                    code_block=
-                                    """def value(swo_aer, pe, loss_perce):
-                                    if swo_aer < 0.1:
-                                        return ((pe * ({} * 365 / 1000)) / 1 - loss_perce) * loss_perce
-                                    else:
-                                        return 0
-                                    """.format(POPfactor))
-
-    arcpy.AddField_management(in_table=out_wwtp, field_name="AERWast1calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_wwtp, field="AERWast1calc",
-                                    expression="!{}_WWTP_AER!".format(nutrient),
-                                    expression_type="PYTHON_9.3")
+    :param in_agglo: path of the input feature class of the agglomerations [required]
+    :type in_agglo: str
+    :param location: path of the feature class for the location of interest [required]
+    :type location: str
+    :param out_agglo: path of the output feature class for the joined agglomerations [required]
+    :type out_agglo: str
+    """
+    name = path.basename(out_agglo)
+    candidates = name + '_Candidates'
+    inside = sep.join(['in_memory', name + '_Inside'])
+    nearby = sep.join(['in_memory', name + '_Nearby'])
+    merged = sep.join(['in_memory', name + '_Merged'])
+
+    try:
+        arcpy.MakeFeatureLayer_management(in_features=in_agglo, out_layer=candidates)
+
+        # join the agglomerations lying within a location
+        arcpy.SpatialJoin_analysis(target_features=candidates, join_features=location, out_feature_class=inside,
+                                   join_operation="JOIN_ONE_TO_ONE", join_type="KEEP_COMMON",
+                                   match_option='INTERSECT')
+
+        # join the other agglomerations in reach of a location to the closest location
+        arcpy.SelectLayerByLocation_management(in_layer=candidates, overlap_type="WITHIN_A_DISTANCE",
+                                               select_features=location, search_distance="2000 Meters",
+                                               selection_type="NEW_SELECTION")
+        arcpy.SelectLayerByLocation_management(in_layer=candidates, overlap_type="INTERSECT",
+                                               select_features=location,
+                                               selection_type="REMOVE_FROM_SELECTION")
+
+        if arcpy.Describe(candidates).FIDSet:  # i.e. some remain (an empty selection would mean all features)
+            arcpy.SpatialJoin_analysis(target_features=candidates, join_features=location,
+                                       out_feature_class=nearby,
+                                       join_operation="JOIN_ONE_TO_ONE", join_type="KEEP_COMMON",
+                                       match_option='CLOSEST', search_radius='2000 Meters')
+            arcpy.Merge_management(inputs=[inside, nearby], output=merged)
+            # restore the order of the input agglomerations (e.g. for DeleteIdentical to keep the same record)
+            arcpy.Sort_management(in_dataset=merged, out_dataset=out_agglo,
+                                  sort_field=[["TARGET_FID", "ASCENDING"]])
+        else:
+            arcpy.CopyFeatures_management(in_features=inside, out_feature_class=out_agglo)
+    finally:
+        # garbage collection (even if the join failed)
+        for intermediate in [merged, nearby, inside, candidates]:
+            if arcpy.Exists(intermediate):
+                arcpy.Delete_management(intermediate)
 
-    arcpy.AddField_management(in_table=out_wwtp, field_name="AERSWOWast1calc", field_type="DOUBLE",
-                              field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
-    arcpy.CalculateField_management(in_table=out_wwtp, field="AERSWOWast1calc",
-                                    expression="!{}_SWO_AER!".format(nutrient),
-                                    expression_type="PYTHON_9.3")
+
+def _add_double_fields(in_table, fields):
+    """
+    Add nullable fields of type double to a table, in a single schema
+    edit where the AddFields tool is available (i.e. in ArcGIS Pro).
+
+    :param in_table: path of the table where to add the fields [required]
+    :type in_table: str
+    :param fields: names of the fields to add [required]
+    :type fields: list
+    """
+    if hasattr(arcpy.management, 'AddFields'):
+        arcpy.management.AddFields(in_table, [[field, "DOUBLE"] for field in fields])
+    else:
+        for field in fields:
+            arcpy.AddField_management(in_table=in_table, field_name=field, field_type="DOUBLE",
+                                      field_is_nullable="NULLABLE", field_is_required="NON_REQUIRED")
+
+
+def _get_wwtp_factors(in_factors_wwtp, nutrient):
+    """
+    Return the WWTP factors for the given nutrient, only reading the
+    table if it was modified since it was last read. All the rows of
+    the table are kept, so another nutrient is only served from memory
+    if its factors are in the same table (the default N and P factors
+    are on separate sheets, each read once).
+    Only tables held in a file (i.e. sheets of a workbook) are cached,
+    any other table (e.g. in a geodatabase) is read on every call.
+
+    :param in_factors_wwtp: path of the input table of the export factors for WWTP types [required]
+    :type in_factors_wwtp: str
+    :param nutrient: nutrient of interest {possible values: 'N' or 'P'} [required]
+    :type nutrient: str
+    :return: factors raw, prelim, primary, second, tertN, tertNP, tertP, and POPfactor
+    :rtype: tuple
+    """
+    # find the workbook holding the sheet, its modification time tells if the cached rows are still valid
+    # (edits to a geodatabase table do not reliably update the modification time of the geodatabase folder)
+    source = in_factors_wwtp
+    while source and not path.exists(source):
+        if path.dirname(source) == source:  # i.e. root not available (e.g. unmapped drive or unreachable share)
+            break
+        source = path.dirname(source)
+    mtime = path.getmtime(source) if path.isfile(source) else None
+
+    cached = _wwtp_factors_cache.get(in_factors_wwtp)
+    if mtime is None or cached is None or cached[0] != mtime:
+        # keep the rows as read (e.g. units or notes rows may hold text), only the requested row is converted
+        with arcpy.da.SearchCursor(in_factors_wwtp, ["FactorName"] + _wwtp_factors_fields) as cursor:
+            all_factors = {}
+            for row in cursor:
+                if row[0] is not None:  # i.e. skip blank rows (e.g. in spreadsheets)
+                    all_factors.setdefault(row[0], row[1:])  # i.e. first row wins if a name is repeated
+        cached = (mtime, all_factors)
+        if mtime is not None:  # i.e. only cache when changes to the table can be detected
+            _wwtp_factors_cache[in_factors_wwtp] = cached
+
+    try:
+        return tuple(float(value) for value in cached[1]['{}_factors'.format(nutrient)])
+    except (KeyError, TypeError, ValueError):  # i.e. row missing, or with empty or non-numeric values
+        raise Exception('Factors for {} are not available in {}'.format(nutrient, in_factors_wwtp))